@@ -18,6 +18,17 @@ from doc2tex import (
 from doc2tex.utils import logger, setup_logger
 
 
+def positive_int(value: str) -> int:
+    # For --jobs: 0 or negative workers doesn't mean anything
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a whole number")
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"needs to be at least 1, got {n}")
+    return n
+
+
 def create_parser() -> argparse.ArgumentParser:
     # Setting up all the flags for terminal usage
     parser = argparse.ArgumentParser(
@@ -26,6 +37,8 @@ def create_parser() -> argparse.ArgumentParser:
 Example usage:
   python cli.py file.docx -o result.tex
   python cli.py file.tex
+  python cli.py *.docx -d converted/ -j 4
+  python cli.py ch1.tex ch2.tex --concat thesis.docx
         """
     )
     
@@ -46,6 +59,26 @@ Example usage:
         help='Folder to save results if batching'
     )
     
+    parser.add_argument(
+        '--concat',
+        metavar='OUT.docx',
+        help='Merge all the .tex inputs into this one Word file'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=positive_int,
+        help='How many files to convert at once when batching '
+             '(default: up to one process per core, or 32 threads with --async)'
+    )
+    
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='Batch with threads instead of processes (good for slow or network drives)'
+    )
+    
     parser.add_argument(
         '--direction',
         choices=['to_latex', 'to_docx'],
@@ -108,6 +141,10 @@ def main():
     parser = create_parser()
     args = parser.parse_args()
     
+    # --concat builds one document in this process, there's nothing to spread over threads
+    if args.concat and args.use_async:
+        parser.error("--concat can't be combined with --async")
+    
     # Setup the logger format
     setup_logger(verbose=args.verbose)
     
@@ -116,14 +153,25 @@ def main():
         converter = DocTeXConverter(options)
         
         # Batch conversion if more than one file
-        if len(args.input) > 1 or args.output_dir:
+        if len(args.input) > 1 or args.output_dir or args.concat:
             logger.info(f"Batch converting {len(args.input)} files...")
             
-            results = converter.batch_convert(
-                args.input,
-                output_dir=args.output_dir,
-                direction=args.direction
-            )
+            if args.use_async:
+                import asyncio
+                results = asyncio.run(converter.batch_convert_async(
+                    args.input,
+                    output_dir=args.output_dir,
+                    direction=args.direction,
+                    jobs=args.jobs
+                ))
+            else:
+                results = converter.batch_convert(
+                    args.input,
+                    output_dir=args.output_dir,
+                    direction=args.direction,
+                    jobs=args.jobs,
+                    concat=args.concat
+                )
             
             success = sum(1 for r in results if r is not None)
             logger.info(f"Done! {success}/{len(results)} worked.")
@@ -136,7 +184,7 @@ def main():
             result = converter.convert(
                 input_file,
                 output_file,
-                direction=args.direction
+                forced_direction=args.direction
             )
             
             print(f"Success! Saved to: {result}")
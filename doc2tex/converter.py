@@ -2,26 +2,45 @@
 # You can use the CLI or the Web UI, but they both use this class eventually.
 
 import os
+import queue
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, List
+from stat import S_ISREG
+from typing import Optional, List, Union
 
 from .options import ConversionOptions
-from .latex import LatexGenerator
-from .docx import DocxGenerator
-from .utils import logger, is_valid_file, cleanup_temp_dir, get_file_info
+from .utils import logger, extract_extension, get_file_info, sniff_file_type
 from .errors import ConversionError, InvalidFileFormatError
 
 
+# The two directions we can go. Interned so comparing them is just a pointer check.
+_TO_LATEX = sys.intern('to_latex')
+_TO_DOCX = sys.intern('to_docx')
+
+# File extensions for each side (sets, so 'in' is a hash lookup)
+_DOCX_EXTS = frozenset({'docx'})
+_TEX_EXTS = frozenset({'tex', 'latex'})
+
+
+def _looks_like(path: str, exts: frozenset, kind: str) -> bool:
+    # Is this file the kind we need? convert() (or the batch reader) already
+    # knows the file is there, so no stat here: the name decides, and only a
+    # misnamed file gets its first bytes peeked at
+    return extract_extension(path) in exts or sniff_file_type(path) == kind
+
+
 class DocTeXConverter:
     """
     This is my main converter class.
     Basically, you give it a file, and it figures out if you want to go to LaTeX 
-    or to Word based on the extension.
+    or to Word based on what's inside it (or the extension, if that's unclear).
     """
     
     # I kept these here just to remember what we support
-    ALLOWED_IN = ['docx', 'tex', 'latex']
-    ALLOWED_OUT = ['docx', 'tex']
+    ALLOWED_IN = frozenset({'docx', 'tex', 'latex'})
+    ALLOWED_OUT = frozenset({'docx', 'tex'})
     
     def __init__(self, settings: Optional[ConversionOptions] = None):
         # If the user didn't pass any settings, we just use defaults
@@ -41,33 +60,37 @@ class DocTeXConverter:
         forced_direction: Optional[str] = None
     ) -> str:
         # This is the function that does everything
-        if not os.path.isfile(input_file):
+        # (parse the path once and reuse it below)
+        p_in = Path(input_file)
+        try:
+            st = p_in.stat()
+        except OSError:
+            st = None
+        if st is None or not S_ISREG(st.st_mode):
             raise ConversionError(f"I can't find the file: {input_file}")
         
-        # Just printing some info for the logs
-        info = get_file_info(input_file)
+        # Just printing some info for the logs (reusing the stat from above)
+        info = get_file_info(input_file, st)
         logger.info(f"Working on: {info['name']}")
         
         # 1. Figure out direction (docx2latex or latex2docx)
         if forced_direction:
             direction = forced_direction
         else:
-            direction = self._guess_direction(input_file)
+            direction = self._detect_direction(p_in)
             
         # 2. Pick a name for the output if we don't have one
         if output_file is None:
-            output_file = self._calc_output_path(input_file, direction)
+            output_file = self._calc_output_path(p_in, direction)
         
         # Make the folder if it's missing (I forgot this once and it crashed)
-        out_dir = os.path.dirname(output_file)
-        if out_dir:
-            os.makedirs(out_dir, exist_ok=True)
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
             
         # 3. Call the generator
         try:
-            if direction == 'to_latex':
+            if direction == _TO_LATEX:
                 return self._run_latex_gen(input_file, output_file)
-            elif direction == 'to_docx':
+            elif direction == _TO_DOCX:
                 return self._run_docx_gen(input_file, output_file)
             else:
                 raise ConversionError(f"Weird direction: {direction}. How did that happen?")
@@ -76,63 +99,291 @@ class DocTeXConverter:
             logger.error(f"Failed to convert {input_file}: {e}")
             raise
     
-    def _guess_direction(self, path: str) -> str:
-        # Checkextension and guess
+    def _detect_direction(self, path: Union[str, Path]) -> str:
+        # Look at what's actually inside the file first, so a renamed
+        # file still goes the right way
+        kind = sniff_file_type(path)
+        if kind == 'docx':
+            return _TO_LATEX
+        elif kind == 'tex':
+            return _TO_DOCX
+        
+        # Can't tell from the contents, so the extension decides
+        return self._guess_direction(path)
+    
+    def _guess_direction(self, path: Union[str, Path]) -> str:
+        # Check extension and guess
         ext = Path(path).suffix.lower().lstrip('.')
-        if ext == 'docx':
-            return 'to_latex'
-        elif ext in ['tex', 'latex']:
-            return 'to_docx'
+        if ext in _DOCX_EXTS:
+            return _TO_LATEX
+        elif ext in _TEX_EXTS:
+            return _TO_DOCX
         else:
             raise InvalidFileFormatError(f"I don't know what to do with .{ext} files. Sorry!")
             
-    def _calc_output_path(self, path: str, dir: str) -> str:
-        # Swaps .docx for .tex or vice versa
+    def _calc_output_path(
+        self,
+        path: Union[str, Path],
+        dir: str,
+        out_dir: Optional[Union[str, Path]] = None
+    ) -> str:
+        # Swaps .docx for .tex or vice versa (and puts it in out_dir if we got one)
         p = Path(path)
-        new_ext = '.tex' if dir == 'to_latex' else '.docx'
-        return str(p.with_suffix(new_ext))
+        new_ext = '.tex' if dir == _TO_LATEX else '.docx'
+        out = Path(out_dir) / (p.stem + new_ext) if out_dir else p.with_suffix(new_ext)
+        
+        # A LaTeX file named .docx would otherwise get overwritten by its own result
+        # (out_dir can be the folder the file is already in, so compare the real paths)
+        if out == p or (out_dir and out.resolve() == p.resolve()):
+            out = out.with_name(p.stem + '_converted' + new_ext)
+        return str(out)
         
     def _run_latex_gen(self, inp: str, out: str) -> str:
         # DOCX -> LaTeX
+        # The generators pull in python-docx, which is slow to import,
+        # so we only load them when there's actually something to convert
+        from .latex import LatexGenerator
+        
         # Need to make sure it's actually a docx file first
-        if not is_valid_file(inp, ['docx']):
+        if not _looks_like(inp, _DOCX_EXTS, 'docx'):
             raise InvalidFileFormatError("I need a .docx file to make LaTeX.")
             
         gen = LatexGenerator(self.settings)
         res = gen.convert(inp, out)
         
         # Clean up temp images if needed
-        if self.settings.clean_temp_files and gen.temp_workspace:
-            cleanup_temp_dir(gen.temp_workspace)
+        if self.settings.clean_temp_files:
+            gen.cleanup_temp_workspace()
             
         return res
         
     def _run_docx_gen(self, inp: str, out: str) -> str:
         # LaTeX -> DOCX
-        if not is_valid_file(inp, ['tex', 'latex']):
+        from .docx import DocxGenerator
+        
+        if not _looks_like(inp, _TEX_EXTS, 'tex'):
             raise InvalidFileFormatError("I need a .tex file to make a Word doc.")
             
         gen = DocxGenerator(self.settings)
         return gen.convert(inp, out)
 
-    def batch(self, files: list, out_dir: Optional[str] = None) -> list:
-        # This is useful if you have a whole folder of reports to convert
-        results = []
-        for f in files:
+    def batch_convert(
+        self,
+        files: list,
+        output_dir: Optional[str] = None,
+        direction: Optional[str] = None,
+        jobs: Optional[int] = None,
+        concat: Optional[str] = None
+    ) -> list:
+        # This is useful if you have a whole folder of reports to convert.
+        # Every file is independent, so with more than one file we hand them
+        # out to a process pool and use all the cores.
+        # With concat set, the .tex files all go into that one .docx instead.
+        results = [None] * len(files)
+        tasks = self._plan_batch(files, output_dir, direction)
+        
+        if concat:
+            self._run_concat(tasks, concat, results)
+            return results
+        
+        workers = jobs or min(len(tasks), os.cpu_count() or 1)
+        
+        # Starting a pool isn't free, so one file stays in this process
+        if len(tasks) == 1:
+            idx, f, target, d = tasks[0]
             try:
-                # If they gave us a target folder, put it there
-                if out_dir:
-                    os.makedirs(out_dir, exist_ok=True)
-                    name = Path(f).stem
-                    # We have to guess the direction again for the extension
-                    d = self._guess_direction(f)
-                    ext = '.tex' if d == 'to_latex' else '.docx'
-                    target = os.path.join(out_dir, name + ext)
-                else:
-                    target = None
-                    
-                results.append(self.convert(f, target))
+                results[idx] = self.convert(f, target, forced_direction=d)
             except Exception as e:
                 logger.warning(f"Skipping {f} because: {e}")
-                results.append(None)
+            return results
+        
+        # Same for --jobs 1, but we can still overlap reading and saving
+        if workers <= 1:
+            self._run_pipeline(tasks, results)
+            return results
+        
+        logger.debug(f"Spreading {len(tasks)} files over {workers} processes")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {
+                pool.submit(_convert_one, self.settings, f, target, d): (idx, f)
+                for idx, f, target, d in tasks
+            }
+            
+            # Whatever finishes first gets reported first, one bad file
+            # doesn't hold up the others
+            for fut in as_completed(pending):
+                idx, f = pending[fut]
+                try:
+                    results[idx] = fut.result()
+                except Exception as e:
+                    logger.warning(f"Skipping {f} because: {e}")
+                    
         return results
+    
+    async def batch_convert_async(
+        self,
+        files: list,
+        output_dir: Optional[str] = None,
+        direction: Optional[str] = None,
+        jobs: Optional[int] = None
+    ) -> list:
+        # Same idea as batch_convert, but with lots of threads on an asyncio loop.
+        # This helps when reading/saving is the slow part (network drives, etc.):
+        # while one file waits on the disk, the others keep going.
+        results = [None] * len(files)
+        tasks = self._plan_batch(files, output_dir, direction)
+        
+        import asyncio
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=jobs or 32) as pool:
+            outcomes = await asyncio.gather(
+                *[loop.run_in_executor(pool, self.convert, f, target, d) for _, f, target, d in tasks],
+                return_exceptions=True
+            )
+        
+        for (idx, f, _, _), res in zip(tasks, outcomes):
+            if isinstance(res, Exception):
+                logger.warning(f"Skipping {f} because: {res}")
+            else:
+                results[idx] = res
+        return results
+    
+    def _plan_batch(self, files: list, output_dir: Optional[str], direction: Optional[str]) -> list:
+        # Work out direction and target for every file up front, so the
+        # workers don't have to guess anything themselves
+        tasks = []
+        out_dir = Path(output_dir) if output_dir else None
+        if out_dir:
+            out_dir.mkdir(parents=True, exist_ok=True)
+        
+        for idx, f in enumerate(files):
+            try:
+                p = Path(f)
+                d = direction or self._detect_direction(p)
+                
+                # If they gave us a target folder, it goes there
+                target = self._calc_output_path(p, d, out_dir)
+                    
+                tasks.append((idx, f, target, d))
+            except Exception as e:
+                logger.warning(f"Skipping {f} because: {e}")
+        return tasks
+    
+    def _run_concat(self, tasks: list, out_path: str, results: list) -> None:
+        # Appends every LaTeX file to one shared Word document (with a page
+        # break between files) and saves it once at the very end
+        from docx.oxml.ns import qn
+        from .docx import DocxGenerator
+        
+        sect_pr = qn('w:sectPr')
+        gen = DocxGenerator(self.settings)
+        doc = None
+        for idx, f, _, d in tasks:
+            # Remember where this file's blocks start, so a file that breaks
+            # halfway can be taken back out again (page break included).
+            # New blocks go in before the trailing sectPr, if there is one.
+            body = doc.element.body if doc is not None else None
+            if body is not None:
+                start = len(body) - (1 if len(body) and body[-1].tag == sect_pr else 0)
+                before = len(body)
+            try:
+                if d != _TO_DOCX:
+                    raise InvalidFileFormatError("Only LaTeX files can be merged into one Word doc.")
+                if not _looks_like(f, _TEX_EXTS, 'tex'):
+                    raise InvalidFileFormatError("I need a .tex file to make a Word doc.")
+                
+                logger.info(f"Adding {Path(f).name} to {out_path}")
+                with open(f, 'r', encoding=self.settings.output_encoding) as fh:
+                    if doc is not None:
+                        doc.add_page_break()
+                    doc = gen.build_into(fh, doc)
+                results[idx] = out_path
+            except Exception as e:
+                if body is not None:
+                    for el in body[start:start + len(body) - before]:
+                        body.remove(el)
+                logger.warning(f"Skipping {f} because: {e}")
+        
+        if doc is None:
+            return
+        
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        doc.save(out_path)
+        logger.info(f"Nice! Saved the word doc to {out_path}")
+    
+    def _run_pipeline(self, tasks: list, results: list) -> None:
+        # Single-process batch in three stages: a reader thread loads the next
+        # .tex file while we parse the current one, and a writer thread saves
+        # the previous .docx. The queues are small on purpose, so a slow disk
+        # makes the other stages wait instead of piling documents up in memory.
+        from .docx import DocxGenerator
+        
+        read_q = queue.Queue(maxsize=4)
+        write_q = queue.Queue(maxsize=4)
+        
+        def reader():
+            for task in tasks:
+                idx, f, target, d = task
+                data = None
+                # DOCX inputs get opened by python-docx itself, no point prefetching
+                if d == _TO_DOCX:
+                    try:
+                        with open(f, 'rb') as fh:
+                            data = fh.read()
+                    except OSError as e:
+                        data = e
+                read_q.put((task, data))
+            read_q.put(None)
+        
+        def writer():
+            while True:
+                item = write_q.get()
+                if item is None:
+                    break
+                idx, f, target, doc = item
+                try:
+                    doc.save(target)
+                    logger.info(f"Nice! Saved the word doc to {target}")
+                    results[idx] = target
+                except Exception as e:
+                    logger.warning(f"Skipping {f} because: {e}")
+        
+        # Daemon threads, so a Ctrl+C in the middle doesn't leave us hanging
+        read_t = threading.Thread(target=reader, daemon=True)
+        write_t = threading.Thread(target=writer, daemon=True)
+        read_t.start()
+        write_t.start()
+        
+        try:
+            while True:
+                item = read_q.get()
+                if item is None:
+                    break
+                (idx, f, target, d), data = item
+                try:
+                    if d != _TO_DOCX:
+                        results[idx] = self.convert(f, target, forced_direction=d)
+                        continue
+                    
+                    if isinstance(data, Exception):
+                        raise ConversionError(f"I can't read the file: {f} ({data})")
+                    if not _looks_like(f, _TEX_EXTS, 'tex'):
+                        raise InvalidFileFormatError("I need a .tex file to make a Word doc.")
+                    
+                    logger.info(f"Working on: {Path(f).name}")
+                    Path(target).parent.mkdir(parents=True, exist_ok=True)
+                    
+                    raw_tex = data.decode(self.settings.output_encoding)
+                    doc = DocxGenerator(self.settings).build(raw_tex)
+                    write_q.put((idx, f, target, doc))
+                except Exception as e:
+                    logger.warning(f"Skipping {f} because: {e}")
+        finally:
+            # Let the writer drain whatever is still queued before we return
+            write_q.put(None)
+            write_t.join()
+
+
+def _convert_one(settings: ConversionOptions, inp: str, out: str, direction: str) -> str:
+    # Runs inside a worker process, so it gets its own fresh converter
+    return DocTeXConverter(settings).convert(inp, out, forced_direction=direction)
@@ -3,46 +3,81 @@
 # I'm using regex to find the main parts, it's not perfect but it handles 
 # normal documents pretty well.
 
+import io
 import os
 import re
-from typing import List, Dict, Optional, Tuple, Any
+from itertools import chain
+from typing import List, Dict, Optional, Tuple, Any, Iterable, Iterator
 from pathlib import Path
 from docx import Document
 from docx.shared import Pt, Inches, RGBColor
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 
-from .options import ConversionOptions
+from .options import ConversionOptions, FontSize
 from .utils import unescape_latex, logger, ensure_directory
 from .errors import ConversionError
 
 
+# All the regex we use, compiled once when the module loads instead of on every call
+
+# A section command at the very start of a block, or an environment we know anywhere in it
+_RE_BLOCK_KIND = re.compile(
+    r'^\\(?P<section>(?:sub){0,2}section)'
+    r'|\\begin\{(?P<env>table|figure|itemize|enumerate|center)\}'
+)
+_RE_SECTION = re.compile(r'\\(?:sub)*section\{([^}]+)\}')
+_RE_TABULAR = re.compile(r'\\begin\{tabular\}\{[^}]+\}(.*?)\\end\{tabular\}', re.DOTALL)
+_RE_TABLE_ROW = re.compile(r'(.*?)(?:\\\\|\Z)', re.DOTALL)
+_RE_TABLE_RULE = re.compile(r'\\(?:hline|toprule|midrule|bottomrule|cline\{[^}]*\})')
+_RE_INCLUDEGRAPHICS = re.compile(r'\\includegraphics(?:\[[^\]]+\])?\{([^}]+)\}')
+# \item as a whole command, so \itemsep / \itemindent don't count
+_RE_ITEM = re.compile(r'\\item(?![A-Za-z])')
+
+# Inline formatting we support right now, all in one pattern so a single
+# pass over the text finds them in order. Escaped dollars (\$) aren't math.
+_RE_INLINE = re.compile(
+    r'\\textbf\{([^}]+)\}'
+    r'|\\textit\{([^}]+)\}'
+    r'|\\underline\{([^}]+)\}'
+    r'|(?<!\\)\$([^$]+)\$'  # Simple inline math between $$
+)
+# Which run property each capture group above turns on (group 0 is the whole match).
+# For math, we just make it italic for now so it looks different
+_INLINE_KINDS = (None, 'bold', 'italic', 'underline', 'italic')
+
+
 class DocxGenerator:
     """
     My class for generating Word docs from LaTeX.
     It's basically a simple parser that looks for commands like \section or \textbf.
     """
     
+    # Styled blank documents, saved as .docx bytes and keyed by font size
+    _TEMPLATE_BYTES: Dict[FontSize, bytes] = {}
+    
     def __init__(self, options: ConversionOptions):
         self.options = options
         self.word_doc = None
         
+        # Which method handles each environment _RE_BLOCK_KIND can find
+        self._env_handlers = {
+            'table': self._add_table,
+            'figure': self._add_image,
+            'itemize': self._add_list,
+            'enumerate': self._add_list,
+            'center': self._add_centered,
+        }
+        
     def convert(self, tex_file: str, docx_file: str) -> str:
         # Tries to turn your .tex into a .docx
         try:
             logger.info(f"Trying to read {tex_file}...")
             
-            # Read all the text
+            # Read the file a block at a time instead of loading all of it,
+            # big theses get pretty large
             with open(tex_file, 'r', encoding=self.options.output_encoding) as f:
-                raw_tex = f.read()
-            
-            # Create a blank Word document
-            self.word_doc = Document()
-            
-            # Set the font to something standard (students love Times New Roman)
-            self._apply_student_styles()
-            
-            # This is where the magic (or mess) happens
-            self._parse_and_build(raw_tex)
+                self._new_document()
+                self._parse_and_build(f)
             
             # Save the result
             self.word_doc.save(docx_file)
@@ -54,6 +89,43 @@ class DocxGenerator:
             logger.error(f"LaTeX parsing failed: {err}")
             raise ConversionError(f"Something went wrong reading the LaTeX file: {err}")
 
+    def build(self, raw_tex: str) -> Document:
+        # Turns LaTeX source into a Word document in memory, without touching
+        # the disk. The batch pipeline uses this so saving can happen elsewhere.
+        self._new_document()
+        self._parse_and_build(self._iter_lines(raw_tex))
+        return self.word_doc
+
+    def build_into(self, lines: Iterable[str], doc: Optional[Document] = None) -> Document:
+        # Like build(), but takes lines (an open file works) and can keep
+        # adding to a document we already have instead of starting a new one.
+        # That's how --concat merges several .tex files into one .docx.
+        if doc is None:
+            self._new_document()
+        else:
+            self.word_doc = doc
+        self._parse_and_build(lines)
+        return self.word_doc
+
+    def _new_document(self) -> None:
+        # Start from a blank Word document that's already styled.
+        # The first one per font size gets built and saved as bytes,
+        # after that we just reload those bytes (much cheaper in big batches).
+        key = self.options.font_size
+        template = DocxGenerator._TEMPLATE_BYTES.get(key)
+        
+        if template is None:
+            self.word_doc = Document()
+            
+            # Set the font to something standard (students love Times New Roman)
+            self._apply_student_styles()
+            
+            buf = io.BytesIO()
+            self.word_doc.save(buf)
+            template = DocxGenerator._TEMPLATE_BYTES[key] = buf.getvalue()
+        
+        self.word_doc = Document(io.BytesIO(template))
+
     def _apply_student_styles(self) -> None:
         # Setup the document styles to look like a standard report
         style = self.word_doc.styles['Normal']
@@ -61,56 +133,84 @@ class DocxGenerator:
         f.name = 'Times New Roman'
         
         # Pull font size from options (usually 12pt)
-        try:
-             # Just stripping 'pt' if it's there
-             sz = int(self.options.font_size.value.replace('pt', ''))
-             f.size = Pt(sz)
-        except:
-             f.size = Pt(12) # fallback
+        f.size = Pt(self.options.font_size.as_pt_int)
 
-    def _parse_and_build(self, content: str) -> None:
-        # We only really care about stuff inside \begin{document}
-        # If we can't find it, we just take everything
-        pattern = r'\\begin\{document\}(.*?)\\end\{document\}'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if match:
-            doc_body = match.group(1).strip()
-        else:
-            # Maybe it's just a snippet?
-            doc_body = content.strip()
-            
-        # I split the body into blocks by double newlines
-        # This usually means separate paragraphs or sections in LaTeX
-        blocks = re.split(r'\n\s*\n', doc_body)
-        
-        for bk in blocks:
+    def _parse_and_build(self, lines: Iterable[str]) -> None:
+        # This is where the magic (or mess) happens.
+        # Blocks come in one at a time, so we never hold the whole file.
+        for bk in self._iter_blocks(lines):
             bk = bk.strip()
             if not bk:
                 continue
                 
-            # Figure out what this block is
-            if bk.startswith('\\section'):
-                self._add_heading(bk, 1)
-            elif bk.startswith('\\subsection'):
-                self._add_heading(bk, 2)
-            elif bk.startswith('\\subsubsection'):
-                self._add_heading(bk, 3)
-            elif '\\begin{table}' in bk:
-                self._add_table(bk)
-            elif '\\begin{figure}' in bk:
-                self._add_image(bk)
-            elif '\\begin{itemize}' in bk or '\\begin{enumerate}' in bk:
-                self._add_list(bk)
-            elif '\\begin{center}' in bk:
-                self._add_centered(bk)
-            else:
+            # Figure out what this block is, with one regex search instead
+            # of checking for every command one after the other
+            m = _RE_BLOCK_KIND.search(bk)
+            if m is None:
                 # If it's none of the above, it's probably just a normal paragraph
                 self._add_paragraph(bk)
+            elif m.group('section'):
+                # \section -> 1, \subsection -> 2, \subsubsection -> 3
+                self._add_heading(bk, m.group('section').count('sub') + 1)
+            else:
+                self._env_handlers[m.group('env')](bk)
+
+    def _iter_blocks(self, lines: Iterable[str]) -> Iterator[str]:
+        # We only really care about stuff inside \begin{document}
+        # If we can't find it, we just take everything
+        begin, end = '\\begin{document}', '\\end{document}'
+        
+        def body(first: str, rest: Iterator[str]) -> Iterator[str]:
+            # Everything up to \end{document}, even if it's mid-line
+            for line in chain([first], rest):
+                pos = line.find(end)
+                if pos != -1:
+                    yield line[:pos]
+                    return
+                yield line
+        
+        # Lines before \begin{document} are kept around only until we know
+        # whether there is one (it's usually just a short preamble)
+        preamble = []
+        rest = iter(lines)
+        for line in rest:
+            pos = line.find(begin)
+            if pos != -1:
+                yield from self._split_blocks(body(line[pos + len(begin):], rest))
+                return
+            preamble.append(line)
+        
+        # Maybe it's just a snippet?
+        yield from self._split_blocks(preamble)
+
+    def _iter_lines(self, text: str) -> Iterator[str]:
+        # Lines of an in-memory string, found with str.find so we don't
+        # make a second copy of the whole text like splitlines() would
+        start = 0
+        while start < len(text):
+            nl = text.find('\n', start)
+            if nl == -1:
+                yield text[start:]
+                return
+            yield text[start : nl + 1]
+            start = nl + 1
+
+    def _split_blocks(self, lines: Iterable[str]) -> Iterator[str]:
+        # I split the body into blocks by blank lines
+        # This usually means separate paragraphs or sections in LaTeX
+        buf = []
+        for line in lines:
+            if line.strip():
+                buf.append(line.rstrip('\r\n'))
+            elif buf:
+                yield '\n'.join(buf)
+                buf = []
+        if buf:
+            yield '\n'.join(buf)
 
     def _add_heading(self, block: str, level: int) -> None:
         # Extract text from \section{...} or \subsection{...}
-        m = re.search(r'\\(?:sub)*section\{([^}]+)\}', block)
+        m = _RE_SECTION.search(block)
         if m:
             title = unescape_latex(m.group(1))
             self.word_doc.add_heading(title, level=level)
@@ -122,91 +222,86 @@ class DocxGenerator:
 
     def _apply_inline(self, text: str, para_obj) -> None:
         # This is my favorite part: a simple inline 'parser'
-        # It looks for formatting tags and adds them as 'runs'
+        # It looks for formatting tags and adds them as 'runs'.
+        # Neighbouring pieces with the same formatting (like \textbf{a}\textbf{b})
+        # are merged first, every extra run is more XML for Word to carry around.
         
-        # These are the things we support right now
-        patterns = [
-            (r'\\textbf\{([^}]+)\}', 'bold'),
-            (r'\\textit\{([^}]+)\}', 'italic'),
-            (r'\\underline\{([^}]+)\}', 'underline'),
-            (r'\$([^$]+)\$', 'math'), # Simple inline math between $$
-        ]
+        # Every command (and every escape) starts with \ or $, and most prose
+        # has neither, so there's nothing to parse or unescape
+        if '\\' not in text and '$' not in text:
+            if text:
+                para_obj.add_run(text)
+            return
         
-        idx = 0
-        while idx < len(text):
-            found_m = None
-            found_type = None
-            
-            # Check all patterns to see which one comes next in the string
-            for pat, t in patterns:
-                m = re.search(pat, text[idx:])
-                if m:
-                    if not found_m or m.start() < found_m.start():
-                        found_m = m
-                        found_type = t
-            
-            if not found_m:
-                # No more formatting tags, just add the rest and finish
-                rest = unescape_latex(text[idx:])
-                if rest:
-                    para_obj.add_run(rest)
-                break
-                
-            # Add the text BEFORE the formatting tag
-            pre = unescape_latex(text[idx : idx + found_m.start()])
+        pending = []
+        current = None
+        for kind, piece in self._inline_pieces(text):
+            if pending and kind != current:
+                self._add_run(para_obj, ''.join(pending), current)
+                pending = []
+            current = kind
+            pending.append(piece)
+        
+        if pending:
+            self._add_run(para_obj, ''.join(pending), current)
+
+    def _inline_pieces(self, text: str) -> Iterator[Tuple[Optional[str], str]]:
+        # Splits text into (formatting, text) pieces, formatting is None for plain text
+        last = 0
+        for m in _RE_INLINE.finditer(text):
+            # The text BEFORE the formatting tag
+            pre = unescape_latex(text[last : m.start()])
             if pre:
-                para_obj.add_run(pre)
-            
-            # Handle the actual formatted text
-            content = unescape_latex(found_m.group(1))
-            run = para_obj.add_run(content)
+                yield None, pre
             
-            if found_type == 'bold':
-                run.bold = True
-            elif found_type == 'italic':
-                run.italic = True
-            elif found_type == 'underline':
-                run.underline = True
-            elif found_type == 'math':
-                # For math, we just make it italic for now so it looks different
-                run.italic = True
-                
-            # Move the index past this match
-            idx += found_m.end()
+            # The actual formatted text
+            group = m.lastindex
+            content = unescape_latex(m.group(group))
+            if content:
+                yield _INLINE_KINDS[group], content
+            last = m.end()
+        
+        # No more formatting tags, just the rest
+        rest = unescape_latex(text[last:])
+        if rest:
+            yield None, rest
+
+    def _add_run(self, para_obj, text: str, kind: Optional[str]) -> None:
+        run = para_obj.add_run(text)
+        if kind:
+            # kind is the name of the run property to switch on
+            setattr(run, kind, True)
 
     def _add_table(self, block: str) -> None:
         # Tries to rebuild a table from tabular
-        tab_m = re.search(r'\\begin\{tabular\}\{[^}]+\}(.*?)\\end\{tabular\}', block, re.DOTALL)
+        tab_m = _RE_TABULAR.search(block)
         if not tab_m:
              return
              
-        rows_text = tab_m.group(1).strip()
-        
-        # Split rows by \\ (the LaTeX row separator)
-        # Note: I'm skipping common lines like \hline or \midrule
-        lines = [r.strip() for r in rows_text.split('\\\\') if r.strip()]
-        lines = [r for r in lines if not r.startswith('\\')]
+        rows_text = tab_m.group(1)
         
-        if not lines:
-             return
-             
-        # Guess how many columns based on the first row
-        first_row = lines[0].split('&')
-        num_c = len(first_row)
-        
-        # Add the table to Word
-        t = self.word_doc.add_table(rows=len(lines), cols=num_c)
-        t.style = 'Table Grid'
-        
-        for r_idx, r_text in enumerate(lines):
-            cells = [unescape_latex(c.strip()) for c in r_text.split('&')]
-            for c_idx, val in enumerate(cells):
-                if c_idx < num_c:
-                     t.rows[r_idx].cells[c_idx].text = val
+        # Walk the rows (separated by \\) in one pass, adding each to the
+        # Word table as we go instead of splitting everything into lists first
+        t = None
+        for m in _RE_TABLE_ROW.finditer(rows_text):
+            # Rule lines like \hline or \midrule aren't content
+            r_text = _RE_TABLE_RULE.sub('', m.group(1)).strip()
+            if not r_text:
+                continue
+            
+            cells = r_text.split('&')
+            if t is None:
+                # Guess how many columns based on the first row
+                t = self.word_doc.add_table(rows=0, cols=len(cells))
+                t.style = 'Table Grid'
+            
+            # zip() drops any extra cells past the column count
+            for cell, val in zip(t.add_row().cells, cells):
+                cell.text = unescape_latex(val.strip())
 
     def _add_image(self, block: str) -> None:
         # Looks for \includegraphics and adds the picture to Word
-        m = re.search(r'\\includegraphics(?:\[[^\]]+\])?\{([^}]+)\}', block)
+        m = _RE_INCLUDEGRAPHICS.search(block)
         if m:
             img_path = m.group(1)
             # We check if the file actually exists
@@ -221,18 +316,27 @@ class DocxGenerator:
     def _add_list(self, block: str) -> None:
         # Reconstructs bullet/numbered lists
         is_num = '\\begin{enumerate}' in block
-        # Find every \item text
-        items = re.findall(r'\\item\s+(.*?)(?=\\item|\n|\\end)', block, re.DOTALL)
+        style = 'List Number' if is_num else 'List Bullet'
         
-        for it in items:
-            style = 'List Number' if is_num else 'List Bullet'
+        # Every \item runs until the next \item (or the end of the list).
+        # Splitting on it keeps items that span several lines
+        # or have formatting inside them in one piece.
+        for part in _RE_ITEM.split(block)[1:]:
+            it = part.split('\\end{', 1)[0]
+            # A line break inside an item is just a space in LaTeX
+            it = ' '.join(it.split())
+            if not it:
+                continue
             p = self.word_doc.add_paragraph(style=style)
-            self._apply_inline(it.strip(), p)
+            self._apply_inline(it, p)
 
     def _add_centered(self, block: str) -> None:
-        m = re.search(r'\\begin\{center\}(.*?)\\end\{center\}', block, re.DOTALL)
-        if m:
-             txt = m.group(1).strip()
+        # Plain string search is plenty for fixed markers like these
+        begin, end = '\\begin{center}', '\\end{center}'
+        start = block.find(begin)
+        stop = block.find(end, start)
+        if start != -1 and stop != -1:
+             txt = block[start + len(begin) : stop].strip()
              p = self.word_doc.add_paragraph()
              p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
              self._apply_inline(txt, p)
@@ -2,26 +2,97 @@
 # This is the part that actually writes the .tex file.
 # Note: Word's structure is a mess compared to LaTeX, so we have to do some guessing.
 
+import io
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional, Tuple, Any
 from pathlib import Path
 from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from docx.oxml.table import CT_Tbl
-from docx.oxml.text.paragraph import CT_P
+from docx.exceptions import InvalidXmlError
+from docx.oxml.ns import qn
 from docx.table import Table
 from docx.text.paragraph import Paragraph
 
 from .options import ConversionOptions, LineSpacing
 from .utils import (
     escape_latex, logger, ensure_directory, 
-    optimize_image, sanitize_filename, get_temp_dir
+    optimize_image, sanitize_filename, get_temp_dir, cleanup_temp_dir
 )
 from .errors import ConversionError, ImageProcessingError
 
 
+# Full XML tag names for the bits of WordprocessingML we look at directly
+_W_P = qn('w:p')
+_W_TBL = qn('w:tbl')
+_W_PPR = qn('w:pPr')
+_W_PSTYLE = qn('w:pStyle')
+_W_JC = qn('w:jc')
+_W_R = qn('w:r')
+_W_T = qn('w:t')
+_W_HYPERLINK = qn('w:hyperlink')
+_W_BR_TYPE = qn('w:type')
+
+# What the non-text bits of a run count as when we read text straight from the XML
+# (same as python-docx 1.x does for run.text; a page break adds nothing)
+_RUN_EXTRAS = {
+    qn('w:tab'): '\t',
+    qn('w:ptab'): '\t',
+    qn('w:cr'): '\n',
+    qn('w:noBreakHyphen'): '-',
+}
+_W_BR = qn('w:br')
+
+# Begin/end wrappers for the paragraph alignments LaTeX has an environment for
+# (anything else, including no alignment at all, just misses the dict)
+_ALIGN_WRAPPERS = {
+    WD_PARAGRAPH_ALIGNMENT.CENTER: ("\\begin{center}\n", "\n\\end{center}"),
+    WD_PARAGRAPH_ALIGNMENT.RIGHT: ("\\begin{flushright}\n", "\n\\end{flushright}"),
+}
+
+# Heading level -> sectioning command. The level number gets pulled out of the
+# style name once ('Heading 2' -> 2); anything deeper than 4 (or a heading
+# style without a number) becomes a subparagraph
+_HEADING_RE = re.compile(r'Heading\s*(\d)')
+_HEADING_CMDS = {
+    1: "\\section{{{}}}",
+    2: "\\subsection{{{}}}",
+    3: "\\subsubsection{{{}}}",
+    4: "\\paragraph{{{}}}",
+    5: "\\subparagraph{{{}}}",
+}
+
+# Fixed chunks of the preamble. _make_preamble just glues the ones the
+# options ask for together, instead of building it up line by line
+_UNICODE_BLOCK = (
+    "% Support for non-english characters\n"
+    "\\usepackage[T1]{fontenc}\n"
+    "\\usepackage[utf8]{inputenc}\n"
+)
+_GRAPHICS_BLOCK = (
+    "\\usepackage{graphicx}\n"
+    "\\graphicspath{{./images/}}\n"
+)
+_PREAMBLE_BASE = (
+    # Better links (clickable)
+    "\\usepackage{hyperref}\n"
+    "\\hypersetup{colorlinks=true, linkcolor=blue, urlcolor=cyan}\n"
+    # Standard math and table packages
+    "\\usepackage{amsmath, amssymb, amsfonts}\n"
+    "\\usepackage{booktabs} % For nice professional tables\n"
+    "\\usepackage{longtable} % In case tables are huge\n"
+    "\\usepackage{array}\n"
+)
+_SPACING_BLOCKS = {
+    LineSpacing.SINGLE: "",
+    LineSpacing.ONE_HALF: "\\usepackage{setspace}\n\\onehalfspacing\n",
+    LineSpacing.DOUBLE: "\\usepackage{setspace}\n\\doublespacing\n",
+}
+_BIB_BLOCK = "\\usepackage{natbib}\n\\bibliographystyle{%s}\n"
+
+
 class LatexGenerator:
     """
     This is my main class for turning a Word doc into LaTeX.
@@ -29,13 +100,72 @@ class LatexGenerator:
     manually like you do with Pandoc sometimes.
     """
     
+    # Finished preambles, keyed by the options that produced them
+    _PREAMBLE_CACHE: Dict[tuple, str] = {}
+    
     def __init__(self, options: ConversionOptions):
         self.options = options
         self.bib_list = [] # Stores bibliography entries we find
         self.img_idx = 0   # Keeps track of how many images we've saved
         self.footer_idx = 0
-        self.temp_workspace = None
+        self._temp_workspace = None
+    
+    @property
+    def temp_workspace(self) -> str:
+        # Scratch folder for extracted images. Only made the first time
+        # something actually needs it, most documents never get that far.
+        if self._temp_workspace is None:
+            self._temp_workspace = get_temp_dir()
+        return self._temp_workspace
+    
+    def cleanup_temp_workspace(self) -> None:
+        # Deletes the scratch folder, if one was ever made
+        if self._temp_workspace is not None:
+            cleanup_temp_dir(self._temp_workspace)
+            self._temp_workspace = None
         
+    @classmethod
+    def convert_many(
+        cls,
+        options: ConversionOptions,
+        pairs: List[Tuple[str, str]],
+        workers: Optional[int] = None
+    ) -> List[Optional[str]]:
+        # Converts a list of (docx_path, tex_path) pairs using a thread pool.
+        # Every job gets its own generator, so bib entries and image counters
+        # never get mixed up between files.
+        # Note: threads only help as far as the work lets go of the GIL -
+        # lxml does while it parses the XML, Pillow does for images, and file
+        # reads/writes do too. The python-docx walking in between doesn't.
+        # Results come back in the same order as pairs, None for the ones that failed.
+        results: List[Optional[str]] = [None] * len(pairs)
+        if not pairs:
+            return results
+        
+        def job(docx_path: str, tex_path: str) -> str:
+            gen = cls(options)
+            try:
+                return gen.convert(docx_path, tex_path)
+            finally:
+                if options.clean_temp_files:
+                    gen.cleanup_temp_workspace()
+        
+        with ThreadPoolExecutor(max_workers=workers or min(len(pairs), os.cpu_count() or 1)) as pool:
+            pending = {
+                pool.submit(job, docx_path, tex_path): (idx, docx_path)
+                for idx, (docx_path, tex_path) in enumerate(pairs)
+            }
+            
+            # Fast ones get collected as soon as they're done
+            for fut in as_completed(pending):
+                idx, docx_path = pending[fut]
+                try:
+                    results[idx] = fut.result()
+                except Exception as e:
+                    logger.warning(f"Skipping {docx_path} because: {e}")
+        
+        return results
+    
     def convert(self, docx_path: str, tex_path: str) -> str:
         # The main function called by the converter
         try:
@@ -44,16 +174,12 @@ class LatexGenerator:
             # Load the actual word file
             my_doc = Document(docx_path)
             
-            # If the user wants images, we need a place to put them
-            if self.options.preserve_images:
-                self.temp_workspace = get_temp_dir()
-            
-            # Build the latex string
-            full_latex = self._build_document(my_doc, tex_path)
+            # Build the latex straight into one text buffer
+            out = io.StringIO()
+            self._build_document(my_doc, tex_path, out)
             
-            # Save it to the file
-            with open(tex_path, 'w', encoding=self.options.output_encoding) as target:
-                target.write(full_latex)
+            # Save it to the file, encoded in one go and written in one go
+            Path(tex_path).write_bytes(out.getvalue().encode(self.options.output_encoding))
             
             # Handle bibliography if we found any entries
             if self.options.extract_bibliography and self.bib_list:
@@ -66,172 +192,196 @@ class LatexGenerator:
             logger.error(f"Ugh, something broke: {err}")
             raise ConversionError(f"Conversion failed mid-way: {err}")
     
-    def _build_document(self, doc: Document, path: str) -> str:
-        # Puts together the preamble and the body
-        output_chunks = []
+    def _build_document(self, doc: Document, path: str, out: io.StringIO) -> None:
+        # Writes the preamble and the body into out
         
         # 1. The Preamble (all the setup stuff)
         if self.options.include_preamble and self.options.standalone_document:
-            output_chunks.append(self._make_preamble())
+            out.write(self._make_preamble())
+            out.write("\n")
         
         # 2. Start of document
         if self.options.standalone_document:
-            output_chunks.append("\\begin{document}\n")
+            out.write("\\begin{document}\n\n")
         
         # 3. The actual content
         # I iterate through the body elements to keep the order correct
-        body_tex = self._parse_body(doc, path)
-        output_chunks.append(body_tex)
+        self._parse_body(doc, path, out)
         
         # 4. Wrap it up
         if self.options.standalone_document:
-            output_chunks.append("\n\\end{document}")
-        
-        return '\n'.join(output_chunks)
+            out.write("\n\n\\end{document}")
     
     def _make_preamble(self) -> str:
+        # The preamble only depends on the options, so in a batch with the
+        # same settings it only gets built once
+        key = self.options.cache_key()
+        preamble = LatexGenerator._PREAMBLE_CACHE.get(key)
+        if preamble is None:
+            preamble = LatexGenerator._PREAMBLE_CACHE[key] = self._build_preamble()
+        return preamble
+    
+    def _build_preamble(self) -> str:
         # This is where we set up the LaTeX packages.
         # I added some extra ones that usually help with engineering reports.
-        lines = []
-        
-        d_type = self.options.document_type.value
-        f_size = self.options.font_size.value
-        lines.append(f"\\documentclass[{f_size}]{{{d_type}}}\n")
-        
-        # Basic character support
-        if self.options.unicode_support:
-            lines.append("% Support for non-english characters")
-            lines.append("\\usepackage[T1]{fontenc}")
-            lines.append("\\usepackage[utf8]{inputenc}")
-        
-        # Layout and Margins
-        lines.append(f"\\usepackage[{self.options.page_margins}]{{geometry}}")
-        
-        # Images - we stick them in an 'images' subfolder for neatness
-        if self.options.preserve_images:
-            lines.append("\\usepackage{graphicx}")
-            lines.append("\\graphicspath{{./images/}}")
-        
-        # Better links (clickable)
-        lines.append("\\usepackage{hyperref}")
-        lines.append("\\hypersetup{colorlinks=true, linkcolor=blue, urlcolor=cyan}")
-        
-        # Standard math and table packages
-        lines.append("\\usepackage{amsmath, amssymb, amsfonts}")
-        lines.append("\\usepackage{booktabs} % For nice professional tables")
-        lines.append("\\usepackage{longtable} % In case tables are huge")
-        lines.append("\\usepackage{array}")
-        
-        # Line spacing (single, double, etc)
-        if self.options.line_spacing != LineSpacing.SINGLE:
-            lines.append("\\usepackage{setspace}")
-            if self.options.line_spacing == LineSpacing.ONE_HALF:
-                lines.append("\\onehalfspacing")
-            elif self.options.line_spacing == LineSpacing.DOUBLE:
-                lines.append("\\doublespacing")
-        
-        # Bibliography setup
-        if self.options.extract_bibliography:
-            lines.append("\\usepackage{natbib}")
-            lines.append(f"\\bibliographystyle{{{self.options.bibliography_style}}}")
+        opts = self.options
+        parts = [
+            f"\\documentclass[{opts.font_size.value}]{{{opts.document_type.value}}}\n\n",
+            # Basic character support
+            _UNICODE_BLOCK if opts.unicode_support else "",
+            # Layout and Margins
+            f"\\usepackage[{opts.page_margins}]{{geometry}}\n",
+            # Images - we stick them in an 'images' subfolder for neatness
+            _GRAPHICS_BLOCK if opts.preserve_images else "",
+            _PREAMBLE_BASE,
+            # Line spacing (single, double, etc)
+            _SPACING_BLOCKS[opts.line_spacing],
+            # Bibliography setup
+            _BIB_BLOCK % opts.bibliography_style if opts.extract_bibliography else "",
+        ]
         
         # Any other random packages the user asked for
-        for pkg in self.options.custom_packages:
-            lines.append(f"\\usepackage{{{pkg}}}")
+        for pkg in opts.custom_packages:
+            parts.append(f"\\usepackage{{{pkg}}}\n")
         
-        return '\n'.join(lines) + '\n'
+        return ''.join(parts)
     
-    def _parse_body(self, doc: Document, path: str) -> str:
+    def _parse_body(self, doc: Document, path: str, out: io.StringIO) -> None:
         # Loop over every item in the document body
         # Paragraphs and Tables are the main things here
-        final_lines = []
+        # Each one is written to out as soon as it's ready, with a blank line in between
+        sep = ""
         
         for el in doc.element.body:
+            tag = el.tag
+            
             # Check if it's a paragraph
-            if isinstance(el, CT_P):
-                p_obj = Paragraph(el, doc)
-                p_tex = self._handle_paragraph(p_obj)
+            if tag == _W_P:
+                # Plain paragraphs are read straight from the XML, the
+                # python-docx wrapper is only built when we need it
+                p_tex = self._plain_paragraph(el)
+                if p_tex is None:
+                    p_tex = self._handle_paragraph(Paragraph(el, doc))
                 if p_tex:
-                    final_lines.append(p_tex)
+                    out.write(sep)
+                    out.write(p_tex)
+                    sep = "\n\n"
             
             # Check if it's a table
-            elif isinstance(el, CT_Tbl):
+            elif tag == _W_TBL:
                 t_obj = Table(el, doc)
                 t_tex = self._handle_table(t_obj)
                 if t_tex:
-                    final_lines.append(t_tex)
+                    out.write(sep)
+                    out.write(t_tex)
+                    sep = "\n\n"
+    
+    def _plain_paragraph(self, el) -> Optional[str]:
+        # Fast path for the most common paragraph: no style or alignment
+        # and runs with nothing but text in them (so no formatting, tabs,
+        # breaks or pictures).
+        # Returns None if the paragraph needs the full treatment.
+        # Word gives nearly every paragraph a pPr (spacing and such), so we
+        # only look for the two things in there the slow path cares about.
+        ppr = el.find(_W_PPR)
+        if ppr is not None and (ppr.find(_W_PSTYLE) is not None or ppr.find(_W_JC) is not None):
+            return None
         
-        return '\n\n'.join(final_lines)
+        parts = []
+        for r in el.iterchildren(_W_R):
+            for child in r:
+                if child.tag != _W_T:
+                    return None
+                parts.append(child.text or '')
+        
+        text = ''.join(parts)
+        if not text.strip():
+            return "" # Ignore empty lines
+        return escape_latex(text)
     
     def _handle_paragraph(self, para: Paragraph) -> str:
         # Turns a single line of text into LaTeX
-        if not para.text.strip():
-            return "" # Ignore empty lines
+        # (para.text walks the whole paragraph, so instead of asking for it up
+        # front we notice empty paragraphs while going through the runs)
         
         # If it's a heading, handle it separately
-        if para.style.name.startswith('Heading'):
-            return self._handle_heading(para)
+        # (every python-docx property is an XML lookup, so we read each one once)
+        s_name = para.style.name
+        if s_name.startswith('Heading'):
+            return self._handle_heading(para, s_name)
         
         # Break the paragraph into 'runs' (bits with different formatting)
         tex_pieces = []
+        has_text = False
         for run in para.runs:
+            raw = run.text
+            if not has_text and raw.strip():
+                has_text = True
+            
+            bold, italic, underline = run.bold, run.italic, run.underline
+            # Try to catch hyperlinks (though docx library is limited here)
+            hyperlink = getattr(run, 'hyperlink', None)
+            
             # Escape LaTeX symbols like % and &
-            txt = escape_latex(run.text)
+            txt = escape_latex(raw)
+            
+            # Most runs are just plain text, nothing else to do for those
+            if not (bold or italic or underline or hyperlink):
+                tex_pieces.append(txt)
+                continue
             
             # Apply common formatting
             # Note: I'm combining them so you can have bold AND italic
-            if run.bold:
+            if bold:
                 txt = f"\\textbf{{{txt}}}"
-            if run.italic:
+            if italic:
                 txt = f"\\textit{{{txt}}}"
-            if run.underline:
+            if underline:
                 txt = f"\\underline{{{txt}}}"
             
-            # Try to catch hyperlinks (though docx library is limited here)
-            if hasattr(run, 'hyperlink') and run.hyperlink:
-                link = run.hyperlink.address if hasattr(run.hyperlink, 'address') else ''
+            if hyperlink:
+                link = getattr(hyperlink, 'address', '')
                 if link:
                     txt = f"\\href{{{link}}}{{{txt}}}"
             
             tex_pieces.append(txt)
         
+        if not has_text:
+            return "" # Ignore empty lines
+        
         clean_text = ''.join(tex_pieces)
         
         # Handle alignment (Center/Right)
         # Word calls them 'CENTER' and 'RIGHT'
         try:
             align = para.alignment
-            if align == WD_PARAGRAPH_ALIGNMENT.CENTER:
-                clean_text = f"\\begin{{center}}\n{clean_text}\n\\end{{center}}"
-            elif align == WD_PARAGRAPH_ALIGNMENT.RIGHT:
-                clean_text = f"\\begin{{flushright}}\n{clean_text}\n\\end{{flushright}}"
-        except:
-            # Sometimes alignment is 'None' or some weird value, just ignore it
-            pass
+        except (ValueError, InvalidXmlError):
+            # Newer Word files can use values python-docx doesn't know
+            # (like 'start'), just treat those as no alignment.
+            # python-docx 1.x complains with ValueError, 0.8.x with InvalidXmlError
+            align = None
+        wrap = _ALIGN_WRAPPERS.get(align)
+        if wrap:
+            clean_text = wrap[0] + clean_text + wrap[1]
             
         return clean_text
     
-    def _handle_heading(self, para: Paragraph) -> str:
+    def _handle_heading(self, para: Paragraph, s_name: str) -> str:
         # Maps Word headings to LaTeX sections
-        txt = escape_latex(para.text)
-        s_name = para.style.name
+        text = para.text
+        if not text.strip():
+            return "" # Ignore empty lines
+        txt = escape_latex(text)
+        
+        m = _HEADING_RE.match(s_name)
+        level = int(m.group(1)) if m else 5
+        cmd = _HEADING_CMDS.get(level, _HEADING_CMDS[5]).format(txt)
         
         # I added some 'Smart' detection for sections that usually start on new pages
-        prefix = ""
-        if "Heading 1" in s_name and self.options.document_type.value in ["report", "thesis"]:
+        if level == 1 and self.options.document_type.value in ["report", "thesis"]:
              # reports usually start Heading 1 on a fresh page
-             prefix = "\\clearpage\n"
-             
-        if 'Heading 1' in s_name:
-            return f"{prefix}\\section{{{txt}}}"
-        elif 'Heading 2' in s_name:
-            return f"\\subsection{{{txt}}}"
-        elif 'Heading 3' in s_name:
-            return f"\\subsubsection{{{txt}}}"
-        elif 'Heading 4' in s_name:
-            return f"\\paragraph{{{txt}}}"
-        else:
-            return f"\\subparagraph{{{txt}}}"
+             return "\\clearpage\n" + cmd
+        return cmd
     
     def _handle_table(self, tbl: Table) -> str:
         # Reconstructs tables. This is always a bit messy.
@@ -250,22 +400,17 @@ class LatexGenerator:
         bits.append(f"\\begin{{tabular}}{{{col_def}}}")
         bits.append("\\toprule") # booktabs style
         
+        # Local name for bits.append, it's called a couple of times per row
+        append = bits.append
         for i, row in enumerate(tbl.rows):
-            cells = []
-            for cell in row.cells:
-                # Clean up text in each cell
-                val = escape_latex(cell.text.strip())
-                cells.append(val)
-            
-            # Join with & and end with \\
-            row_str = " & ".join(cells) + " \\\\"
-            bits.append(row_str)
+            # Clean up text in each cell, join with & and end with \\
+            append(" & ".join(escape_latex(self._cell_text(cell).strip()) for cell in row.cells) + " \\\\")
             
             # Add fancy lines for headers
             if i == 0:
-                bits.append("\\midrule")
+                append("\\midrule")
             else:
-                bits.append("\\hline")
+                append("\\hline")
         
         bits.append("\\bottomrule")
         bits.append("\\end{tabular}")
@@ -276,14 +421,43 @@ class LatexGenerator:
         
         return '\n'.join(bits)
     
+    def _cell_text(self, cell) -> str:
+        # Same as cell.text, but reads the paragraphs' text straight from the
+        # XML instead of building a Paragraph wrapper for each one first
+        # (done by hand instead of CT_P.text, which older python-docx doesn't have)
+        return '\n'.join(self._xml_paragraph_text(p) for p in cell._tc.iterchildren(_W_P))
+    
+    def _xml_paragraph_text(self, p) -> str:
+        # Text of a w:p element: its runs, plus the runs inside hyperlinks
+        parts = []
+        for child in p:
+            if child.tag == _W_R:
+                runs = (child,)
+            elif child.tag == _W_HYPERLINK:
+                runs = child.iterchildren(_W_R)
+            else:
+                continue
+            for r in runs:
+                for bit in r:
+                    tag = bit.tag
+                    if tag == _W_T:
+                        parts.append(bit.text or '')
+                    elif tag == _W_BR:
+                        if bit.get(_W_BR_TYPE, 'textWrapping') == 'textWrapping':
+                            parts.append('\n')
+                    else:
+                        parts.append(_RUN_EXTRAS.get(tag, ''))
+        return ''.join(parts)
+    
     def _write_bib_file(self, tex_path: str) -> None:
         # Writes the references to a separate .bib file
-        bib_file = tex_path.replace('.tex', '.bib')
+        # (with_suffix only touches the end, replace() would also hit a
+        # '.tex' in a folder name, or give back tex_path itself if there isn't one)
+        bib_file = Path(tex_path).with_suffix('.bib')
         
         try:
-            with open(bib_file, 'w', encoding=self.options.output_encoding) as b:
-                for entry in self.bib_list:
-                    b.write(entry + '\n\n')
+            bib_text = ''.join(entry + '\n\n' for entry in self.bib_list)
+            bib_file.write_bytes(bib_text.encode(self.options.output_encoding))
             logger.info(f"Cool, created bib file at {bib_file}")
-        except:
+        except (OSError, UnicodeError):
              logger.warning("Couldnt write the bib file for some reason.")
@@ -20,6 +20,11 @@ class FontSize(Enum):
     PT_10 = "10pt"
     PT_11 = "11pt"
     PT_12 = "12pt"
+    
+    # The size as a plain number, e.g. 12 for "12pt"
+    @property
+    def as_pt_int(self) -> int:
+        return int(self.value[:-2])
 
 
 # Line spacing options
@@ -93,6 +98,14 @@ class ConversionOptions:
             'standalone_document': self.standalone_document,
         }
     
+    # Hashable snapshot of the settings, for caching stuff that only depends on them
+    # (lists like custom_packages become tuples so the whole thing can be a dict key)
+    def cache_key(self) -> tuple:
+        return tuple(
+            (k, tuple(v) if isinstance(v, list) else v)
+            for k, v in self.to_dict().items()
+        )
+    
     # Create options from dictionary
     @classmethod
     def from_dict(cls, data: dict):
@@ -134,8 +147,8 @@ class ConversionOptions:
         # Add any custom packages user wants
         packages.extend(self.custom_packages)
         
-        # Remove duplicates
-        return list(set(packages))
+        # Remove duplicates (dict keeps the order, so the list is always the same)
+        return list(dict.fromkeys(packages))
     
     # Basic validation
     def validate(self) -> bool:
@@ -3,30 +3,43 @@
 
 import os
 import re
+import functools
 import logging
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, List, Tuple
-from PIL import Image
 import hashlib
 
 from .errors import ImageProcessingError, UnicodeHandlingError
 
 
 # Setup logging
+# Timestamps are only worth formatting when someone asked for verbose output
+_LOG_FORMAT = logging.Formatter('%(levelname)s: %(message)s')
+_VERBOSE_LOG_FORMAT = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+
 def setup_logger(name: str = "doctex", verbose: bool = False) -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+    formatter = _VERBOSE_LOG_FORMAT if verbose else _LOG_FORMAT
+    
+    # Already set up (this runs once at import and again from cli/web),
+    # just switch our handler over to the right format
+    if getattr(logger, '_doctex_configured', False):
+        logger._doctex_handler.setFormatter(formatter)
+        return logger
     
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+    handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger._doctex_handler = handler
+    logger._doctex_configured = True
     
     return logger
 
@@ -34,6 +47,12 @@ def setup_logger(name: str = "doctex", verbose: bool = False) -> logging.Logger:
 logger = setup_logger()
 
 
+# Patterns used by the helpers below, compiled once
+_INVALID_FN_RE = re.compile(r'[<>:"/\\|?*]')
+_WS_RE = re.compile(r' +')
+_NL_RE = re.compile(r'\n\n+')
+
+
 # LaTeX special characters that need escaping
 LATEX_SPECIAL_CHARS = {
     '&': r'\&',
@@ -49,21 +68,41 @@ LATEX_SPECIAL_CHARS = {
 }
 
 
+# Matches any one of the characters above (they're all single characters,
+# so a character class is enough)
+_ESCAPE_RE = re.compile('[' + re.escape(''.join(LATEX_SPECIAL_CHARS)) + ']')
+_ESCAPE_SEARCH = _ESCAPE_RE.search
+
+
+def _escape_char(m: re.Match) -> str:
+    return LATEX_SPECIAL_CHARS[m.group(0)]
+
+
 def escape_latex(text: str) -> str:
     # Escape special characters for LaTeX
     # Otherwise LaTeX will throw errors
     if not text:
         return ""
     
-    # Handle backslash first to avoid double-escaping
-    text = text.replace('\\', r'\textbackslash{}')
-    
-    # Escape other special characters
-    for char, escaped in LATEX_SPECIAL_CHARS.items():
-        if char != '\\':  # already handled
-            text = text.replace(char, escaped)
+    # Same trick as unescape_latex: table labels, single words and short runs
+    # come up over and over, so those get remembered
+    if len(text) < 128:
+        return _escape_latex_cached(text)
+    return _escape_latex(text)
+
+
+def _escape_latex(text: str) -> str:
+    # Most text has nothing to escape at all. Finding that out stops at the
+    # first special character, and if there isn't one we skip building a new string.
+    if not _ESCAPE_SEARCH(text):
+        return text
     
-    return text
+    # One pass over the text, so the backslashes we add for ~ and ^
+    # (or \textbackslash{}'s braces) never get escaped a second time
+    return _ESCAPE_RE.sub(_escape_char, text)
+
+
+_escape_latex_cached = functools.lru_cache(maxsize=4096)(_escape_latex)
 
 
 def unescape_latex(text: str) -> str:
@@ -71,15 +110,26 @@ def unescape_latex(text: str) -> str:
     if not text:
         return ""
     
+    # Short bits (table cells, list items, titles) repeat a lot, so we remember them.
+    # Long paragraphs are almost always unique and would just push those out.
+    if len(text) < 64:
+        return _unescape_latex_cached(text)
+    return _unescape_latex(text)
+
+
+def _unescape_latex(text: str) -> str:
     for char, escaped in LATEX_SPECIAL_CHARS.items():
         text = text.replace(escaped, char)
     
     return text
 
 
+_unescape_latex_cached = functools.lru_cache(maxsize=4096)(_unescape_latex)
+
+
 def sanitize_filename(filename: str) -> str:
     # Remove invalid characters from filename
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    filename = _INVALID_FN_RE.sub('_', filename)
     filename = filename.strip('. ')
     
     # Limit length
@@ -116,11 +166,22 @@ def cleanup_temp_dir(temp_dir: str) -> None:
 
 def get_file_hash(filepath: str) -> str:
     # Calculate MD5 hash of file
-    hash_md5 = hashlib.md5()
     with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+        try:
+            # Python 3.11+ does the reading loop in C with big buffers
+            return hashlib.file_digest(f, 'md5').hexdigest()
+        except AttributeError:
+            pass
+        
+        # Older Pythons: read 1 MiB at a time into the same buffer
+        hash_md5 = hashlib.md5()
+        buf = memoryview(bytearray(1 << 20))
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            hash_md5.update(buf[:n])
+        return hash_md5.hexdigest()
 
 
 # Image processing functions
@@ -131,6 +192,9 @@ def optimize_image(
     quality: int = 85
 ) -> Tuple[str, int, int]:
     # Resize and compress image
+    # Pillow is imported here so the CLI doesn't pay for it on startup
+    from PIL import Image
+    
     try:
         with Image.open(image_path) as img:
             # Convert to RGB if needed
@@ -157,8 +221,26 @@ def optimize_image(
         raise ImageProcessingError(f"Failed to process image {image_path}: {e}")
 
 
+def optimize_images(
+    jobs: List[Tuple[str, str, Optional[int], int]]
+) -> List[Tuple[str, int, int]]:
+    # Same as optimize_image, but for a whole list of
+    # (image_path, output_path, max_width, quality) jobs at once.
+    # Pillow lets go of the GIL while it decodes/resizes/encodes,
+    # so a thread pool really does work on several images at a time.
+    if not jobs:
+        return []
+    
+    workers = min(len(jobs), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # map() keeps the order and raises the first error, like a plain loop would
+        return list(pool.map(lambda job: optimize_image(*job), jobs))
+
+
 def get_image_dimensions(image_path: str) -> Tuple[int, int]:
     # Get image width and height
+    from PIL import Image
+    
     try:
         with Image.open(image_path) as img:
             return img.size
@@ -169,8 +251,8 @@ def get_image_dimensions(image_path: str) -> Tuple[int, int]:
 
 def normalize_whitespace(text: str) -> str:
     # Clean up extra whitespace
-    text = re.sub(r' +', ' ', text)
-    text = re.sub(r'\n\n+', '\n\n', text)
+    text = _WS_RE.sub(' ', text)
+    text = _NL_RE.sub('\n\n', text)
     return text.strip()
 
 
@@ -189,6 +271,30 @@ def extract_extension(filename: str) -> str:
     return os.path.splitext(filename)[1].lower().lstrip('.')
 
 
+# DOCX files are ZIP archives, and every ZIP starts with these bytes
+ZIP_MAGIC = b'PK\x03\x04'
+
+
+def sniff_file_type(filepath: str) -> Optional[str]:
+    # Peek at the first bytes to guess what a file really is,
+    # regardless of its name. Returns 'docx', 'tex' or None if unsure.
+    try:
+        with open(filepath, 'rb') as f:
+            head = f.read(512)
+    except OSError:
+        return None
+    
+    if head.startswith(ZIP_MAGIC):
+        return 'docx'
+    
+    # LaTeX almost always starts with a command or a comment
+    head = head.lstrip(b'\xef\xbb\xbf').lstrip()
+    if head[:1] in (b'\\', b'%'):
+        return 'tex'
+    
+    return None
+
+
 def is_valid_file(filepath: str, extensions: List[str]) -> bool:
     # Check if file exists and has correct extension
     if not os.path.isfile(filepath):
@@ -207,9 +313,11 @@ def format_file_size(size_bytes: int) -> str:
     return f"{size_bytes:.2f} TB"
 
 
-def get_file_info(filepath: str) -> dict:
+def get_file_info(filepath: str, stat: Optional[os.stat_result] = None) -> dict:
     # Get file metadata
-    stat = os.stat(filepath)
+    # Pass in a stat result if you already have one, saves asking the disk again
+    if stat is None:
+        stat = os.stat(filepath)
     return {
         'path': filepath,
         'name': os.path.basename(filepath),
@@ -1,7 +1,9 @@
 # Simple test script for doc2tex
 # Checks if the converter can load and run basic functions
 
+import asyncio
 import os
+import tempfile
 import unittest
 from doc2tex import DocTeXConverter, ConversionOptions
 
@@ -16,6 +18,21 @@ class TestConverter(unittest.TestCase):
         # Check if options load correctly
         self.assertEqual(self.options.font_size.value, "12pt")
         self.assertTrue(self.options.standalone_document)
+    
+    def test_latex_packages_order(self):
+        # Duplicates get dropped but the order stays the same every time
+        opts = ConversionOptions(custom_packages=['tikz', 'hyperref', 'tikz'])
+        pkgs = opts.get_latex_packages()
+        self.assertEqual(len(pkgs), len(set(pkgs)))
+        self.assertEqual(pkgs[:2], ['graphicx', 'hyperref'])
+        self.assertEqual(pkgs[-1], 'tikz')
+
+    def test_escape_latex(self):
+        # Each special character should be escaped exactly once
+        from doc2tex.utils import escape_latex, unescape_latex
+        self.assertEqual(escape_latex("50% of a_b & c\\d ~x^"),
+                         "50\\% of a\\_b \\& c\\textbackslash{}d \\textasciitilde{}x\\textasciicircum{}")
+        self.assertEqual(unescape_latex(escape_latex("{#1} costs $5")), "{#1} costs $5")
 
     def test_detect_to_latex(self):
         # Check if it detects docx files correctly
@@ -27,5 +44,217 @@ class TestConverter(unittest.TestCase):
         dir = self.converter._detect_direction("test.tex")
         self.assertEqual(dir, "to_docx")
 
+    def test_detect_by_contents(self):
+        # A renamed file should still be detected from its first bytes
+        with tempfile.TemporaryDirectory() as tmp:
+            fake_docx = os.path.join(tmp, 'report.bak')
+            with open(fake_docx, 'wb') as f:
+                f.write(b'PK\x03\x04rest of the zip')
+            self.assertEqual(self.converter._detect_direction(fake_docx), "to_latex")
+            
+            fake_tex = os.path.join(tmp, 'notes.docx')
+            with open(fake_tex, 'w') as f:
+                f.write("\n  \\documentclass{article}\n")
+            self.assertEqual(self.converter._detect_direction(fake_tex), "to_docx")
+            
+            # And a real docx with the wrong name should still convert
+            from docx import Document
+            renamed = os.path.join(tmp, 'real.bak')
+            doc = Document()
+            doc.add_paragraph('Renamed')
+            doc.save(renamed)
+            out = DocTeXConverter(ConversionOptions(standalone_document=False)).convert(renamed)
+            with open(out, encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'Renamed')
+
+    def test_batch_convert(self):
+        # Two small .tex files should both come back as .docx, in order
+        with tempfile.TemporaryDirectory() as tmp:
+            files = []
+            for name in ['a', 'b']:
+                path = os.path.join(tmp, name + '.tex')
+                with open(path, 'w') as f:
+                    f.write("\\begin{document}\nHello " + name + "\n\\end{document}\n")
+                files.append(path)
+            
+            out_dir = os.path.join(tmp, 'out')
+            results = self.converter.batch_convert(files, output_dir=out_dir, jobs=2)
+            self.assertEqual(results, [os.path.join(out_dir, 'a.docx'), os.path.join(out_dir, 'b.docx')])
+            for r in results:
+                self.assertTrue(os.path.isfile(r))
+            
+            # --jobs 1 goes through the threaded read/convert/save pipeline instead
+            results = self.converter.batch_convert(files + [os.path.join(tmp, 'missing.tex')], output_dir=out_dir, jobs=1)
+            self.assertEqual(results[2], None)
+            self.assertTrue(all(os.path.isfile(r) for r in results[:2]))
+            
+            # --concat puts both into one document, separated by a page break
+            merged = os.path.join(out_dir, 'all.docx')
+            results = self.converter.batch_convert(files, concat=merged)
+            self.assertEqual(results, [merged, merged])
+            from docx import Document
+            texts = [p.text for p in Document(merged).paragraphs]
+            self.assertEqual([t for t in texts if t.strip()], ['Hello a', 'Hello b'])
+            
+            # A file that breaks halfway through shouldn't leave anything behind,
+            # not even its page break (the bad byte comes after a few blocks were added)
+            bad = os.path.join(tmp, 'bad.tex')
+            with open(bad, 'wb') as f:
+                f.write(b"\\begin{document}\n" + b"Half done\n\n" * 2000 + b"\xff\n\\end{document}\n")
+            results = self.converter.batch_convert([files[0], bad, files[1]], concat=merged)
+            self.assertEqual(results, [merged, None, merged])
+            merged_doc = Document(merged)
+            texts = [p.text for p in merged_doc.paragraphs]
+            self.assertEqual([t for t in texts if t.strip()], ['Hello a', 'Hello b'])
+            self.assertEqual(merged_doc.element.xml.count('w:type="page"'), 1)
+            
+            # A LaTeX file called .docx, converted into its own folder,
+            # mustn't get overwritten by its result
+            misnamed = os.path.join(tmp, 'notes.docx')
+            with open(misnamed, 'w') as f:
+                f.write("\\begin{document}\nNotes\n\\end{document}\n")
+            results = self.converter.batch_convert([misnamed], output_dir=tmp)
+            self.assertEqual(results, [os.path.join(tmp, 'notes_converted.docx')])
+            with open(misnamed) as f:
+                self.assertTrue(f.read().startswith("\\begin{document}"))
+            
+            # And the asyncio version should give the same answer
+            results = asyncio.run(self.converter.batch_convert_async(files, output_dir=out_dir))
+            self.assertEqual(results, [os.path.join(out_dir, 'a.docx'), os.path.join(out_dir, 'b.docx')])
+
+    def test_inline_formatting(self):
+        # Bold/italic/underline/math should come out as separate runs,
+        # with neighbours that look the same merged into one
+        from doc2tex.docx import DocxGenerator
+        doc = DocxGenerator(self.options).build("Plain \\textbf{bo}\\textbf{ld} costs \\$5, $x$ \\underline{u}.")
+        runs = [(r.text, r.bold, r.italic, r.underline) for r in doc.paragraphs[0].runs]
+        self.assertEqual(runs, [
+            ('Plain ', None, None, None),
+            ('bold', True, None, None),
+            (' costs $5, ', None, None, None),
+            ('x', None, True, None),
+            (' ', None, None, None),
+            ('u', None, None, True),
+            ('.', None, None, None),
+        ])
+
+    def test_table(self):
+        # Rows and cells of a simple tabular should land in a Word table
+        from doc2tex.docx import DocxGenerator
+        doc = DocxGenerator(self.options).build(
+            "\\begin{table}\n\\begin{tabular}{|c|c|}\n\\toprule\nName & Score \\\\\n\\midrule\n"
+            "\\textbf{Ada} & 10 & extra \\\\\n\\hline\n\\bottomrule\n\\end{tabular}\n\\end{table}"
+        )
+        table = doc.tables[0]
+        self.assertEqual([[c.text for c in row.cells] for row in table.rows], [['Name', 'Score'], ['\\textbf{Ada}', '10']])
+
+    def test_list_items(self):
+        # Items spanning lines or holding formatting shouldn't get cut short
+        from doc2tex.docx import DocxGenerator
+        doc = DocxGenerator(self.options).build(
+            "\\begin{enumerate}\n\\item First \\textbf{bold}\n  continued\n\\item Second\n\\end{enumerate}"
+        )
+        self.assertEqual([(p.style.name, p.text) for p in doc.paragraphs],
+                         [('List Number', 'First bold continued'), ('List Number', 'Second')])
+        self.assertTrue(doc.paragraphs[0].runs[1].bold)
+        
+        # \itemsep and friends aren't items
+        doc = DocxGenerator(self.options).build(
+            "\\begin{itemize}\n\\setlength{\\itemsep}{0pt}\n\\item One\n\\item Two\n\\end{itemize}"
+        )
+        self.assertEqual([(p.style.name, p.text) for p in doc.paragraphs],
+                         [('List Bullet', 'One'), ('List Bullet', 'Two')])
+
+    def test_docx_to_latex(self):
+        # Headings, formatting, alignment and tables should all make it to LaTeX
+        from docx import Document
+        from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+        doc = Document()
+        doc.add_heading('Intro & Scope', level=2)
+        p = doc.add_paragraph('Cost is 5% ')
+        p.add_run('bold').bold = True
+        doc.add_paragraph('')
+        doc.add_paragraph('Plain & simple')
+        doc.add_paragraph('Spaced out').paragraph_format.space_after = 0
+        doc.add_paragraph('Middle').alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        # 'start' is a newer alignment python-docx can't map, it should just be ignored
+        from docx.oxml.ns import qn
+        odd = doc.add_paragraph('Start')
+        odd.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
+        odd._p.pPr.find(qn('w:jc')).set(qn('w:val'), 'start')
+        table = doc.add_table(rows=2, cols=2)
+        for r, row in enumerate([['A', 'B_1'], ['1', '2']]):
+            for c, val in enumerate(row):
+                table.cell(r, c).text = val
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'report.docx')
+            doc.save(src)
+            options = ConversionOptions(standalone_document=False)
+            out = DocTeXConverter(options).convert(src)
+            with open(out, encoding='utf-8') as f:
+                tex = f.read()
+        
+        self.assertEqual(tex, "\n\n".join([
+            "\\subsection{Intro \\& Scope}",
+            "Cost is 5\\% \\textbf{bold}",
+            "Plain \\& simple",
+            "Spaced out",
+            "\\begin{center}\nMiddle\n\\end{center}",
+            "Start",
+            "\n".join([
+                "\\begin{table}[h!]", "\\centering", "\\begin{tabular}{|c|c|}", "\\toprule",
+                "A & B\\_1 \\\\", "\\midrule", "1 & 2 \\\\", "\\hline", "\\bottomrule",
+                "\\end{tabular}", "\\caption{Automated Table from Word}", "\\end{table}",
+            ]),
+        ]))
+
+    def test_convert_many(self):
+        # Several docx files at once on threads, results in the same order
+        from docx import Document
+        from doc2tex.latex import LatexGenerator
+        options = ConversionOptions(standalone_document=False)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            pairs = []
+            for i in range(3):
+                doc = Document()
+                doc.add_paragraph(f'File {i} & more')
+                src = os.path.join(tmp, f'doc{i}.docx')
+                doc.save(src)
+                pairs.append((src, os.path.join(tmp, f'doc{i}.tex')))
+            pairs.append((os.path.join(tmp, 'missing.docx'), os.path.join(tmp, 'missing.tex')))
+            
+            results = LatexGenerator.convert_many(options, pairs, workers=2)
+            self.assertEqual(results[:3], [tex for _, tex in pairs[:3]])
+            self.assertIsNone(results[3])
+            for i in range(3):
+                with open(pairs[i][1], encoding='utf-8') as f:
+                    self.assertEqual(f.read(), f"File {i} \\& more")
+
+    def test_optimize_images(self):
+        # Results come back in the same order as the jobs, one bad image raises
+        from PIL import Image
+        from doc2tex.utils import optimize_images
+        from doc2tex.errors import ImageProcessingError
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            jobs = []
+            for name, size in [('wide', (400, 200)), ('small', (50, 100))]:
+                src = os.path.join(tmp, name + '.png')
+                Image.new('RGBA', size, (255, 0, 0, 128)).save(src)
+                jobs.append((src, os.path.join(tmp, name + '.jpg'), 200, 80))
+            
+            results = optimize_images(jobs)
+            self.assertEqual(results, [
+                (jobs[0][1], 200, 100),  # shrunk down to max_width
+                (jobs[1][1], 50, 100),   # already small enough
+            ])
+            self.assertTrue(all(os.path.isfile(out) for out, _, _ in results))
+            
+            bad = (os.path.join(tmp, 'missing.png'), os.path.join(tmp, 'missing.jpg'), None, 80)
+            with self.assertRaises(ImageProcessingError):
+                optimize_images([jobs[0], bad])
+
 if __name__ == '__main__':
     unittest.main()